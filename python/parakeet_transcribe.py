@@ -6,25 +6,297 @@ Standalone executable for ASR transcription using onnx-asr
 import sys
 import os
 import time
-
-# Handle multiprocessing spawn on macOS
-if '-c' in sys.argv:
-    code_index = sys.argv.index('-c') + 1
-    if code_index < len(sys.argv):
-        exec(sys.argv[code_index])
-    sys.exit(0)
-
 import argparse
+import contextlib
+import difflib
+import itertools
 import json
+import math
+import multiprocessing
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-import numpy as np
+from typing import get_args
 
 os.environ['HF_HUB_DISABLE_PROGRESS_BARS'] = '1'
 os.environ['HF_HUB_DISABLE_TELEMETRY'] = '1'
 
-from onnx_asr import load_model
+# numpy, onnxruntime and onnx_asr take seconds to import, so they are imported
+# inside the functions that need them, after arguments have been validated
+
+# Execution providers in order of preference; ORT assigns each op to the first provider that supports it
+PREFERRED_PROVIDERS = [
+    'CoreMLExecutionProvider',
+    'CUDAExecutionProvider',
+    'DmlExecutionProvider',
+    'CPUExecutionProvider',
+]
+
+PROVIDER_OPTIONS = {
+    'CoreMLExecutionProvider': {'MLComputeUnits': 'ALL', 'ModelFormat': 'MLProgram'},
+}
+
+SENTENCE_END_PUNCTS = frozenset('.!?')
+
+# Quantization option pairing the int8 encoder with the fp32 decoder/joint network
+MIXED_QUANTIZATION = 'int8-encoder'
+
+# NeMo transducer models (the only ones with a separate decoder/joint network) that
+# MIXED_QUANTIZATION supports, and the Hugging Face repositories onnx-asr loads them from
+MIXED_QUANTIZATION_REPOS = {
+    'nemo-fastconformer-ru-rnnt': 'istupakov/stt_ru_fastconformer_hybrid_large_pc_onnx',
+    'nemo-parakeet-rnnt-0.6b': 'istupakov/parakeet-rnnt-0.6b-onnx',
+    'nemo-parakeet-tdt-0.6b-v2': 'istupakov/parakeet-tdt-0.6b-v2-onnx',
+    'nemo-parakeet-tdt-0.6b-v3': 'istupakov/parakeet-tdt-0.6b-v3-onnx',
+}
+
+# Providers with no kernels for the dynamically quantized ops (DynamicQuantizeLinear,
+# MatMulInteger, ConvInteger) of the int8 models. Such a graph is split into dozens of
+# small partitions with CPU ops in between, which is slower than running it on the CPU,
+# where MLAS executes the integer GEMMs with VNNI/dot-product instructions.
+INT8_UNSUPPORTED_PROVIDERS = frozenset({'CoreMLExecutionProvider'})
+
+# Audio shared by consecutive chunks of a long file, in seconds; chunks must be longer
+CHUNK_OVERLAP_DURATION = 15.0
+
+# Shortest run of matching tokens trusted to stitch overlapping chunks together
+MIN_SPLICE_TOKENS = 3
+
+def create_session_options(num_threads=0):
+    """
+    Build ONNX Runtime session options tuned for CPU inference.
+
+    Args:
+        num_threads: Intra-op thread count (0 = ONNX Runtime's default of one per physical core)
+
+    Returns:
+        onnxruntime.SessionOptions shared by all model sessions
+    """
+    if num_threads:
+        # OpenMP/BLAS pools (numpy's, or an OpenMP build of ORT) size themselves to every
+        # logical core when first loaded; cap them to the same count before importing
+        for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            os.environ.setdefault(name, str(num_threads))
+
+    import onnxruntime as ort
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # Concurrent runs (--workers) share each session's intra-op thread pool
+    sess_options.intra_op_num_threads = num_threads
+
+    # Full batches repeat the same shapes, so the arena and the memory pattern
+    # planned on the first run serve every later run without new allocations
+    sess_options.enable_cpu_mem_arena = True
+    sess_options.enable_mem_pattern = True
+
+    # Hand out parallel loop iterations in smaller dynamic blocks so threads
+    # finishing early take over work instead of idling at the end of each op
+    sess_options.add_session_config_entry('session.dynamic_block_base', '4')
+
+    if sys.platform == 'darwin':
+        # Spinning idle workers keeps laptop cores hot between ops and leads to throttling
+        sess_options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+
+    return sess_options
+
+def select_providers(requested='auto', quantization=None):
+    """
+    Build the execution provider list passed to load_model.
+
+    Args:
+        requested: Provider name, or 'auto' to rank every available provider
+        quantization: Model quantization; 'auto' skips providers that can't run int8 models
+
+    Returns:
+        List of provider names or (name, options) tuples, always ending with CPU
+    """
+    import onnxruntime as ort
+
+    if requested == 'auto':
+        available = set(ort.get_available_providers())
+        names = [name for name in PREFERRED_PROVIDERS if name in available]
+        if quantization in ('int8', MIXED_QUANTIZATION):
+            names = [name for name in names if name not in INT8_UNSUPPORTED_PROVIDERS]
+    else:
+        names = [requested]
+
+    if 'CPUExecutionProvider' not in names:
+        names.append('CPUExecutionProvider')
+
+    return [(name, PROVIDER_OPTIONS[name]) if name in PROVIDER_OPTIONS else name for name in names]
+
+def prepare_mixed_precision_model(model):
+    """
+    Assemble a model directory pairing the int8 encoder with the fp32 decoder/joint network.
+
+    The encoder dominates inference time and gains the most from int8 kernels, while
+    the small decoder/joint network runs once per decoding step and loses accuracy
+    when quantized for little speed benefit.
+
+    Args:
+        model: Model name (one of MIXED_QUANTIZATION_REPOS)
+
+    Returns:
+        Path to a directory onnx-asr can load without quantization
+
+    Raises:
+        ValueError: If the model has no separate int8 encoder and fp32 decoder/joint network
+    """
+    import shutil
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.constants import HF_HUB_CACHE
+
+    if model not in MIXED_QUANTIZATION_REPOS:
+        raise ValueError(f"--quantization {MIXED_QUANTIZATION} needs a NeMo transducer model "
+                         f"({', '.join(MIXED_QUANTIZATION_REPOS)}), got {model}")
+
+    repo_id = MIXED_QUANTIZATION_REPOS[model]
+    model_files = {
+        'encoder-model.onnx': 'encoder-model.int8.onnx',
+        'decoder_joint-model.onnx': 'decoder_joint-model.onnx',
+        'vocab.txt': 'vocab.txt',
+        'config.json': 'config.json',
+    }
+
+    def download(local_files_only):
+        snapshot_dir = Path(snapshot_download(repo_id, allow_patterns=list(model_files.values()),
+                                              local_files_only=local_files_only))
+        missing = [name for name in model_files.values() if not (snapshot_dir / name).is_file()]
+        if missing:
+            raise FileNotFoundError(f"{repo_id} is missing {', '.join(missing)}")
+        return snapshot_dir
+
+    # Like onnx-asr, use the cached snapshot and only contact the Hub when files are missing
+    # (LocalEntryNotFoundError is a FileNotFoundError)
+    try:
+        snapshot_dir = download(local_files_only=True)
+    except FileNotFoundError:
+        snapshot_dir = download(local_files_only=False)
+
+    # Keyed on the snapshot revision so an updated upstream model gets a fresh directory
+    model_dir = (Path(HF_HUB_CACHE) / 'reaspeech-lite' / repo_id.replace('/', '--') / snapshot_dir.name /
+                 MIXED_QUANTIZATION)
+    if all((model_dir / name).is_file() for name in model_files):
+        return model_dir
+
+    model_dir.mkdir(parents=True, exist_ok=True)
+    for name, source_name in model_files.items():
+        target = model_dir / name
+        target.unlink(missing_ok=True)
+        try:
+            # Hard links avoid duplicating the weights already in the Hugging Face cache
+            os.link(snapshot_dir / source_name, target)
+        except OSError:
+            shutil.copyfile(snapshot_dir / source_name, target)
+
+    return model_dir
+
+def load_asr(model, quantization, sess_options, requested_provider='auto'):
+    """
+    Load the ASR model, falling back to CPU-only if an accelerated provider fails.
+
+    Args:
+        model: Model name
+        quantization: Model quantization (None, 'int8' or MIXED_QUANTIZATION)
+        sess_options: onnxruntime.SessionOptions for all model sessions
+        requested_provider: Provider name, or 'auto'
+
+    Returns:
+        ASR model instance (with timestamps)
+    """
+    from onnx_asr import load_model
+    from onnxruntime.capi import onnxruntime_pybind11_state as ort_errors
+
+    # Errors an execution provider raises while creating or compiling a session; download,
+    # missing-file and invalid-model errors would fail on the CPU too and are not retried
+    provider_errors = (ort_errors.EPFail, ort_errors.Fail, ort_errors.NotImplemented, ort_errors.RuntimeException)
+
+    providers = select_providers(requested_provider, quantization)
+    provider_names = [p[0] if isinstance(p, tuple) else p for p in providers]
+
+    path = None
+    if quantization == MIXED_QUANTIZATION:
+        path = prepare_mixed_precision_model(model)
+        quantization = None
+
+    try:
+        asr = load_model(model, path, quantization=quantization, sess_options=sess_options, providers=providers)
+    except provider_errors as e:
+        if provider_names == ['CPUExecutionProvider']:
+            raise
+        print(f"Failed to load model with {', '.join(provider_names)} ({e}), retrying on CPU", file=sys.stderr)
+        provider_names = ['CPUExecutionProvider']
+        asr = load_model(model, path, quantization=quantization, sess_options=sess_options, providers=provider_names)
+
+    # Report what the encoder session actually runs on; ORT silently drops providers it can't use
+    session = getattr(asr.asr, '_encoder', None) or getattr(asr.asr, '_model', None)
+    if session is not None:
+        provider_names = session.get_providers()
+    print(f"Using execution providers: {', '.join(provider_names)}", file=sys.stderr)
+    return asr.with_timestamps()
+
+@contextlib.contextmanager
+def audio_readahead(audio_path, total_samples):
+    """
+    Hint the OS to start reading a range of an audio file ahead of time.
+
+    Chunks are read with blocking reads, so on a cold cache each read stalls on the
+    disk. posix_fadvise(WILLNEED) queues the read in the kernel and returns at once,
+    so the next batch's audio can load while the batches before it are recognized.
+    Byte offsets are estimated from the file size, which is exact for
+    PCM WAV and close enough for compressed formats.
+
+    Args:
+        audio_path: Path to audio file
+        total_samples: Total number of samples in the file
+
+    Yields:
+        Function taking a (start, end) sample range to prefetch, or None where
+        posix_fadvise is unavailable (macOS, Windows)
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        yield None
+        return
+
+    # Page cache readahead applies to the file, not the descriptor, so a
+    # separate descriptor works alongside libsndfile's
+    fd = os.open(audio_path, os.O_RDONLY)
+    try:
+        bytes_per_sample = os.fstat(fd).st_size / max(1, total_samples)
+
+        def prefetch(start, end):
+            offset = int(start * bytes_per_sample)
+            os.posix_fadvise(fd, offset, int(end * bytes_per_sample) - offset + 1, os.POSIX_FADV_WILLNEED)
+
+        yield prefetch
+    finally:
+        os.close(fd)
+
+def prefetch_file(audio_path):
+    """
+    Ask the OS to read a whole file into the page cache ahead of use.
 
-def chunk_audio_generator(audio_file_handle, total_samples, file_sr, chunk_duration=120.0, overlap_duration=15.0):
+    Blocks while the kernel queues the reads, so call it off the critical path.
+    Does nothing where posix_fadvise is unavailable (macOS, Windows).
+
+    Args:
+        audio_path: Path to audio file
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+
+    fd = os.open(audio_path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+def chunk_audio_generator(audio_file_handle, total_samples, file_sr, chunk_duration=120.0,
+                          overlap_duration=CHUNK_OVERLAP_DURATION):
     """
     Generator that yields audio chunks on-demand to avoid loading entire file into memory.
 
@@ -36,12 +308,23 @@ def chunk_audio_generator(audio_file_handle, total_samples, file_sr, chunk_durat
         overlap_duration: Overlap between chunks in seconds (default 15s)
 
     Yields:
-        (chunk_audio, start_time, end_time, chunk_index, total_chunks) tuples
+        (chunk_audio, start_time, end_time, chunk_index, total_chunks) tuples, with
+        chunk_audio as float32 mono. chunk_audio is a view of a buffer reused for
+        every chunk, so it is only valid until the next chunk is requested; copy it
+        to keep it longer.
     """
+    import numpy as np
+
     chunk_samples = int(chunk_duration * file_sr)
     overlap_samples = int(overlap_duration * file_sr)
     stride = chunk_samples - overlap_samples
 
+    # Every chunk is read (and downmixed) into the same buffers rather than a fresh array
+    channels = audio_file_handle.channels
+    buffer = np.empty(min(chunk_samples, total_samples), dtype=np.float32)
+    if channels > 1:
+        read_buffer = np.empty((len(buffer), channels), dtype=np.float32)
+
     # Pre-calculate total number of chunks
     if total_samples <= chunk_samples:
         total_chunks = 1
@@ -53,7 +336,12 @@ def chunk_audio_generator(audio_file_handle, total_samples, file_sr, chunk_durat
         end = min(start + chunk_samples, total_samples)
 
         audio_file_handle.seek(start)
-        chunk = audio_file_handle.read(end - start, dtype=np.float32)
+        if channels == 1:
+            chunk = audio_file_handle.read(out=buffer[:end - start])
+        else:
+            # Downmix to mono without a float64 intermediate
+            frames = audio_file_handle.read(out=read_buffer[:end - start])
+            chunk = np.mean(frames, axis=1, dtype=np.float32, out=buffer[:len(frames)])
 
         start_time = start / file_sr
         end_time = end / file_sr
@@ -64,51 +352,191 @@ def chunk_audio_generator(audio_file_handle, total_samples, file_sr, chunk_durat
         if end >= total_samples:
             break
 
+def batch_chunks(chunks, batch_size, chunk_samples, free_buffers):
+    """
+    Copy chunks from chunk_audio_generator into reusable zero-padded batch buffers.
+
+    Args:
+        chunks: Iterable of chunk tuples from chunk_audio_generator
+        batch_size: Maximum number of chunks per batch
+        chunk_samples: Maximum length of a chunk in samples
+        free_buffers: queue.Queue of float32 [batch_size, chunk_samples] arrays, or None
+            placeholders that are allocated on first use; a buffer is taken for each
+            batch and must be put back once the batch has been recognized
+
+    Yields:
+        (buffer, lengths, chunk_infos) tuples, where the first len(lengths) rows of
+        buffer hold the batch, lengths is an int64 array of valid samples per row and
+        chunk_infos holds the (start_time, end_time, chunk_index, total_chunks) of each row
+    """
+    import numpy as np
+
+    buffer = None
+    lengths = []
+    chunk_infos = []
+    for chunk, *chunk_info in chunks:
+        if buffer is None:
+            buffer = free_buffers.get()
+            if buffer is None:
+                buffer = np.empty((batch_size, chunk_samples), dtype=np.float32)
+
+        length = len(chunk)
+        row = buffer[len(lengths)]
+        row[:length] = chunk
+        row[length:] = 0.0
+        lengths.append(length)
+        chunk_infos.append(chunk_info)
+
+        if len(lengths) == batch_size:
+            yield buffer, np.array(lengths, dtype=np.int64), chunk_infos
+            buffer = None
+            lengths = []
+            chunk_infos = []
+
+    if lengths:
+        yield buffer, np.array(lengths, dtype=np.int64), chunk_infos
+
+def recognize_batch(asr, waveforms, waveform_lens, sample_rate):
+    """
+    Recognize a zero-padded batch of waveforms.
+
+    Calls the model directly instead of going through recognize(), which would copy
+    the batch into a freshly allocated padded array and compute per-token
+    log-probabilities that are never used.
+
+    Args:
+        asr: ASR model instance (with timestamps)
+        waveforms: float32 array [batch, samples], zero past each row's length
+        waveform_lens: int64 array of valid samples per row
+        sample_rate: Sample rate of the waveforms
+
+    Returns:
+        List of recognition results, one per row
+    """
+    waveforms, waveform_lens = asr.resampler(waveforms, waveform_lens, sample_rate)
+    return list(asr.asr.recognize_batch(waveforms, waveform_lens))
+
+def has_token_timestamps(result):
+    """Whether a recognition result carries per-token timestamps (not every model provides them)."""
+    return result.tokens is not None and result.timestamps is not None
+
+def find_overlap_splice(prev_tokens, new_tokens):
+    """
+    Find where a chunk's tokens pick up from the previous chunk's within their overlap.
+
+    Args:
+        prev_tokens: Previous chunk's tokens inside the overlap region
+        new_tokens: New chunk's tokens inside the overlap region
+
+    Returns:
+        (prev_keep, new_skip) tuple - keep the first prev_keep overlap tokens of
+        the previous chunk and skip the first new_skip tokens of the new one - or
+        None if the chunks share no run of at least MIN_SPLICE_TOKENS tokens
+    """
+    matcher = difflib.SequenceMatcher(None, prev_tokens, new_tokens, autojunk=False)
+    match = matcher.find_longest_match(0, len(prev_tokens), 0, len(new_tokens))
+    if match.size < MIN_SPLICE_TOKENS:
+        return None
+
+    return match.a + match.size, match.b + match.size
+
+def merge_chunk_result(chunk_tokens, chunk_timestamps, result, chunk_start, overlap_duration):
+    """
+    Append one chunk's recognition result, removing tokens repeated from the previous chunk.
+
+    Args:
+        chunk_tokens: Per-chunk token lists merged so far (modified in place)
+        chunk_timestamps: Per-chunk float64 timestamp arrays merged so far (modified in place)
+        result: Recognition result for the chunk (with tokens and timestamps)
+        chunk_start: Start time of the chunk in seconds
+        overlap_duration: Overlap with the previous chunk in seconds
+    """
+    import numpy as np
+
+    adjusted_timestamps = np.asarray(result.timestamps, dtype=np.float64) + chunk_start
+
+    if chunk_tokens:
+        overlap_end = chunk_start + overlap_duration
+        prev_tokens = chunk_tokens[-1]
+        prev_timestamps = chunk_timestamps[-1]
+
+        # Timestamps are sorted within a chunk, so the overlap regions are contiguous runs
+        tail_start = int(np.searchsorted(prev_timestamps, chunk_start))
+        head_end = int(np.searchsorted(adjusted_timestamps, overlap_end))
+        splice = find_overlap_splice(prev_tokens[tail_start:], result.tokens[:head_end])
+
+        if splice is not None:
+            # Stitch at the longest run of tokens both chunks agree on
+            prev_keep, new_skip = splice
+            chunk_tokens[-1] = prev_tokens[:tail_start + prev_keep]
+            chunk_timestamps[-1] = prev_timestamps[:tail_start + prev_keep]
+            tokens = result.tokens[new_skip:]
+            adjusted_timestamps = adjusted_timestamps[new_skip:]
+        else:
+            # No reliable token match; keep tokens past the overlap region
+            # or later than anything already emitted. Both are suffixes of the
+            # sorted timestamps, so the kept tokens are the longer of the two.
+            cut = min(int(np.searchsorted(adjusted_timestamps, overlap_end, side='left')),
+                      int(np.searchsorted(adjusted_timestamps, prev_timestamps[-1], side='right')))
+            tokens = result.tokens[cut:]
+            adjusted_timestamps = adjusted_timestamps[cut:]
+    else:
+        tokens = result.tokens
+
+    if tokens:
+        chunk_tokens.append(tokens)
+        chunk_timestamps.append(adjusted_timestamps)
+
+# Tokens come from the model's fixed vocabulary, so each distinct token is only tested once
+@lru_cache(maxsize=None)
+def ends_sentence(token):
+    """Whether a token ends a sentence (ignoring trailing whitespace)."""
+    return token.rstrip()[-1:] in SENTENCE_END_PUNCTS
+
 def tokens_to_sentences(tokens, timestamps):
     """
     Group tokens into sentences based on punctuation.
 
     Args:
         tokens: List of token strings
-        timestamps: List of timestamps (one per token, representing token start time)
+        timestamps: List or float64 array of timestamps (one per token, representing token start time)
 
     Returns:
         List of dicts with {text, start, end}
     """
-    if not tokens or not timestamps:
+    import numpy as np
+
+    num_tokens = min(len(tokens), len(timestamps))
+    if num_tokens == 0:
         return []
 
-    sentences = []
-    current_tokens = []
-    current_start = timestamps[0] if timestamps else 0.0
-    sentence_end_puncts = {'.', '!', '?'}
-
-    for i, (token, ts) in enumerate(zip(tokens, timestamps)):
-        current_tokens.append(token)
-        is_sentence_end = any(token.strip().endswith(p) for p in sentence_end_puncts)
-        is_last_token = (i == len(tokens) - 1)
-
-        if is_sentence_end or is_last_token:
-            if i + 1 < len(timestamps):
-                current_end = timestamps[i + 1]
-            else:
-                current_end = ts + 0.16
+    timestamps = np.asarray(timestamps[:num_tokens], dtype=np.float64)
+
+    # Sentence boundaries and times are computed as whole arrays; Python only
+    # touches each token once for a cached punctuation lookup and once per sentence to join text
+    is_end = np.fromiter(map(ends_sentence, tokens[:num_tokens]), dtype=np.bool_, count=num_tokens)
+    is_end[-1] = True
+    ends = np.flatnonzero(is_end)
+    starts = np.concatenate(([0], ends[:-1] + 1))
 
-            text = ''.join(current_tokens).strip()
-            if text:
-                sentences.append({
-                    'text': text,
-                    'start': current_start,
-                    'end': current_end
-                })
+    # A sentence ends where the next token starts, or 0.16s after the final token
+    next_starts = np.append(timestamps[1:], timestamps[-1] + 0.16)
 
-            current_tokens = []
-            if i + 1 < len(timestamps):
-                current_start = timestamps[i + 1]
+    sentences = []
+    for start, end, start_time, end_time in zip(starts.tolist(), ends.tolist(),
+                                                timestamps[starts].tolist(), next_starts[ends].tolist()):
+        text = ''.join(tokens[start:end + 1]).strip()
+        if text:
+            sentences.append({
+                'text': text,
+                'start': start_time,
+                'end': end_time
+            })
 
     return sentences
 
-def transcribe_with_chunking(asr, audio_path, chunk_duration=120.0, overlap_duration=15.0):
+def transcribe_with_chunking(asr, audio_path, chunk_duration=120.0, overlap_duration=CHUNK_OVERLAP_DURATION, assume_16k=False,
+                             batch_size=4, num_workers=1):
     """
     Transcribe audio file with chunking for long files, preserving timestamps.
     Memory-efficient: processes chunks on-demand without loading entire file.
@@ -118,89 +546,297 @@ def transcribe_with_chunking(asr, audio_path, chunk_duration=120.0, overlap_dura
         audio_path: Path to audio file
         chunk_duration: Duration of each chunk in seconds
         overlap_duration: Overlap between chunks in seconds
+        assume_16k: Fail instead of resampling if the file is not 16kHz
+        batch_size: Number of chunks recognized per model call
+        num_workers: Number of batches recognized concurrently
 
     Returns:
         List of sentence dicts with {text, start, end}
     """
+    import numpy as np
     import soundfile as sf
+    from onnx_asr.utils import SampleRates, is_supported_sample_rate
 
     with sf.SoundFile(audio_path) as f:
         total_samples = f.frames
         file_sr = f.samplerate
         duration = total_samples / file_sr
 
+        if assume_16k and file_sr != 16000:
+            raise ValueError(f"Expected 16kHz audio, got {file_sr}Hz")
+        if not is_supported_sample_rate(file_sr):
+            rates = ', '.join(f'{rate}Hz' for rate in get_args(SampleRates))
+            raise ValueError(f"Unsupported sample rate {file_sr}Hz (supported: {rates})")
+
         if duration <= chunk_duration:
+            # Decode straight into a one-row batch; at 16kHz the model reads it without any copy
+            audio = np.empty((1, total_samples), dtype=np.float32)
             f.seek(0)
-            audio = f.read(dtype=np.float32)
+            if f.channels == 1:
+                f.read(out=audio[0])
+            else:
+                np.mean(f.read(dtype=np.float32), axis=1, dtype=np.float32, out=audio[0])
 
-            result = asr.recognize(audio, sample_rate=16000)
-            if hasattr(result, 'tokens') and hasattr(result, 'timestamps'):
+            result, = recognize_batch(asr, audio, np.array([total_samples], dtype=np.int64), file_sr)
+            if has_token_timestamps(result):
                 return tokens_to_sentences(result.tokens, result.timestamps)
-            else:
-                text = result.text if hasattr(result, 'text') else str(result)
-                return [{'text': text, 'start': 0.0, 'end': duration}]
+            return [{'text': result.text, 'start': 0.0, 'end': duration}]
 
         # Progress messages go to stderr - C++ code will filter and show in Reaper console
         print(f"Processing {duration:.1f}s audio in chunks of {chunk_duration}s...", file=sys.stderr)
 
-        all_tokens = []
-        all_timestamps = []
-
-        # Process chunks on-demand using generator (memory-efficient)
-        for chunk, chunk_start, chunk_end, chunk_idx, total_chunks in chunk_audio_generator(
-            f, total_samples, file_sr, chunk_duration=chunk_duration, overlap_duration=overlap_duration
-        ):
-            # Progress messages go to stderr - C++ code will filter and show in Reaper console
-            print(f"Processing chunk {chunk_idx+1}/{total_chunks} ({chunk_start:.1f}s - {chunk_end:.1f}s)...", file=sys.stderr)
-            result = asr.recognize(chunk, sample_rate=16000)
-
-            if hasattr(result, 'tokens') and hasattr(result, 'timestamps'):
-                adjusted_timestamps = [ts + chunk_start for ts in result.timestamps]
-
-                if chunk_idx > 0 and all_timestamps:
-                    last_prev_time = all_timestamps[-1]
-                    overlap_end = chunk_start + overlap_duration
-
-                    filtered_tokens = []
-                    filtered_timestamps = []
-                    for token, ts in zip(result.tokens, adjusted_timestamps):
-                        if ts >= overlap_end or ts > last_prev_time:
-                            filtered_tokens.append(token)
-                            filtered_timestamps.append(ts)
-
-                    all_tokens.extend(filtered_tokens)
-                    all_timestamps.extend(filtered_timestamps)
-                else:
-                    all_tokens.extend(result.tokens)
-                    all_timestamps.extend(adjusted_timestamps)
+        # Tokens and timestamps are kept per chunk (a token list and a float64 array)
+        # and joined once at the end instead of growing two parallel lists
+        chunk_tokens = []
+        chunk_timestamps = []
+
+        def merge_batch(chunk_infos, future):
+            for (chunk_start, _, _, _), result in zip(chunk_infos, future.result()):
+                if has_token_timestamps(result):
+                    merge_chunk_result(chunk_tokens, chunk_timestamps, result, chunk_start, overlap_duration)
+
+        # Batch buffers are reused across batches: one being filled plus one per worker.
+        # They are allocated on first use so short files only ever create one.
+        chunk_samples = int(chunk_duration * file_sr)
+        stride = chunk_samples - int(overlap_duration * file_sr)
+        free_buffers = queue.Queue()
+        for _ in range(num_workers + 1):
+            free_buffers.put(None)
+
+        def recognize(buffer, lengths):
+            try:
+                # Trim to the longest chunk; only a short final batch needs the copy
+                waveforms = np.ascontiguousarray(buffer[:len(lengths), :lengths.max()])
+                # Chunks stay at the file rate; onnx-asr resamples to 16kHz with its polyphase sinc filter
+                return recognize_batch(asr, waveforms, lengths, file_sr)
+            finally:
+                free_buffers.put(buffer)
+
+        # Process chunks on-demand using generator (memory-efficient), a batch at a time.
+        # ONNX Runtime releases the GIL, so batches on worker threads run concurrently
+        # while the main thread reads the next one; results are merged in chunk order.
+        # Up to num_workers batches are in flight while the next is read, so reading
+        # stays off the critical path even when every worker is busy (or --workers 1).
+        in_flight = deque()
+        with audio_readahead(audio_path, total_samples) as prefetch, \
+                ThreadPoolExecutor(max_workers=num_workers) as pool:
+            chunks = chunk_audio_generator(
+                f, total_samples, file_sr, chunk_duration=chunk_duration, overlap_duration=overlap_duration
+            )
+            for buffer, lengths, chunk_infos in batch_chunks(chunks, batch_size, chunk_samples, free_buffers):
+                for chunk_start, chunk_end, chunk_idx, total_chunks in chunk_infos:
+                    # Progress messages go to stderr - C++ code will filter and show in Reaper console
+                    print(f"Processing chunk {chunk_idx+1}/{total_chunks} ({chunk_start:.1f}s - {chunk_end:.1f}s)...", file=sys.stderr)
+
+                in_flight.append((chunk_infos, pool.submit(recognize, buffer, lengths)))
+
+                # Start loading the next batch's unread audio (everything past this batch's
+                # last chunk) so it arrives while this batch is recognized
+                read_end = round(chunk_infos[-1][1] * file_sr)
+                if prefetch is not None and read_end < total_samples:
+                    prefetch(read_end, min(read_end + batch_size * stride, total_samples))
+
+                # Bound the batches resident at once by waiting on the oldest; its
+                # buffer is then free for the batch read while the others run
+                if len(in_flight) > num_workers:
+                    merge_batch(*in_flight.popleft())
+
+            while in_flight:
+                merge_batch(*in_flight.popleft())
+
+    if not chunk_tokens:
+        return []
 
+    all_tokens = list(itertools.chain.from_iterable(chunk_tokens))
+    all_timestamps = np.concatenate(chunk_timestamps)
     return tokens_to_sentences(all_tokens, all_timestamps)
 
+def write_sentences(sentences):
+    """
+    Write sentences to stdout as JSON lines in a single write, instead of one print per sentence.
+
+    Args:
+        sentences: List of sentence dicts with {text, start, end}
+    """
+    sys.stdout.write(''.join(json.dumps(segment) + '\n' for segment in sentences))
+
+def check_chunk_duration(chunk_duration):
+    """
+    Validate a chunk duration.
+
+    Args:
+        chunk_duration: Chunk duration in seconds
+
+    Returns:
+        chunk_duration as a float
+
+    Raises:
+        ValueError: If it isn't a finite number longer than the chunk overlap
+    """
+    chunk_duration = float(chunk_duration)
+    if not math.isfinite(chunk_duration) or chunk_duration <= CHUNK_OVERLAP_DURATION:
+        raise ValueError(f"chunk_duration must be a finite number of seconds greater than the "
+                         f"{CHUNK_OVERLAP_DURATION:g}s chunk overlap, got {chunk_duration}")
+    return chunk_duration
+
+def parse_request(line, args):
+    """
+    Parse one --serve request line.
+
+    Args:
+        line: Either a bare audio file path or a JSON object such as
+            {"audio_file": "...", "chunk_duration": 60.0}
+        args: Parsed command line arguments supplying defaults
+
+    Returns:
+        Dict with audio_file and chunk_duration
+    """
+    if not line.startswith('{'):
+        return {'audio_file': line, 'chunk_duration': args.chunk_duration}
+
+    request = json.loads(line)
+    if not isinstance(request, dict) or 'audio_file' not in request:
+        raise ValueError(f"Request is missing audio_file: {line}")
+
+    return {
+        'audio_file': str(request['audio_file']),
+        'chunk_duration': check_chunk_duration(request.get('chunk_duration', args.chunk_duration)),
+    }
+
+def serve(asr, args):
+    """
+    Transcribe audio files requested on stdin, one request per line, reusing the loaded model.
+
+    A request is a bare path or a JSON object (see parse_request). Each file's
+    sentences are written to stdout as JSON lines, followed by a {"done": path}
+    line on success or an {"error": message, "audio_file": path} line on
+    failure, so the caller can tell where one request's results end.
+
+    Requests are read and parsed on a separate thread, which also starts loading
+    the next file into the page cache while the current one is transcribed. It
+    stays at most one request ahead.
+
+    Args:
+        asr: ASR model instance (with timestamps)
+        args: Parsed command line arguments
+    """
+    import threading
+
+    # Parsed requests (or the exception parsing raised), then None at end of input
+    requests = queue.Queue(maxsize=1)
+
+    def read_requests():
+        try:
+            for line in sys.stdin:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    request = parse_request(line, args)
+                except Exception as e:
+                    requests.put(e)
+                    continue
+
+                requests.put(request)
+                # Only a hint; bad or missing paths are reported when the request is processed
+                with contextlib.suppress(Exception):
+                    prefetch_file(request['audio_file'])
+        except Exception as e:
+            # Reading stdin failed; report it rather than ending silently
+            requests.put(e)
+        finally:
+            requests.put(None)
+
+    threading.Thread(target=read_requests, daemon=True).start()
+
+    for request in iter(requests.get, None):
+        start_time = time.time()
+        audio_path = None
+        try:
+            if isinstance(request, Exception):
+                raise request
+            audio_path = request['audio_file']
+            if not Path(audio_path).exists():
+                raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+            sentences = transcribe_with_chunking(asr, audio_path, chunk_duration=request['chunk_duration'],
+                                                 assume_16k=args.assume_16k, batch_size=args.batch_size,
+                                                 num_workers=args.workers)
+        except Exception as e:
+            print(f"ERROR: Transcription failed: {str(e)}", file=sys.stderr)
+            print(json.dumps({'error': str(e), 'audio_file': audio_path}), flush=True)
+            continue
+
+        write_sentences(sentences)
+        print(json.dumps({'done': audio_path}), flush=True)
+
+        elapsed = time.time() - start_time
+        print(f"Processing time: {elapsed:.2f}s", file=sys.stderr)
+
+def positive_int(value):
+    """argparse type for options that must be an integer of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description='Transcribe audio using Parakeet TDT')
-    parser.add_argument('audio_file', type=str, help='Path to audio file (WAV, 16kHz)')
+    parser.add_argument('audio_file', type=str, nargs='?',
+                       help='Path to audio file (WAV, resampled to 16kHz if needed)')
     parser.add_argument('--model', type=str, default='nemo-parakeet-tdt-0.6b-v2',
                        help='Model name (default: nemo-parakeet-tdt-0.6b-v2)')
     parser.add_argument('--chunk-duration', type=float, default=120.0,
                        help='Chunk duration in seconds for long files (default: 120.0)')
+    parser.add_argument('--batch-size', type=positive_int, default=4,
+                       help='Chunks recognized per model call for long files (default: 4)')
+    parser.add_argument('--workers', type=positive_int, default=1,
+                       help='Batches recognized concurrently for long files (default: 1)')
     parser.add_argument('--quantization', type=str, default='int8',
-                       help='Model quantization (default: int8, options: int8, None)')
+                       help='Model quantization (default: int8, options: int8, int8-encoder, None)')
+    parser.add_argument('--provider', type=str, default='auto',
+                       help='ONNX Runtime execution provider (default: auto, e.g. CPUExecutionProvider)')
+    parser.add_argument('--threads', type=int, default=0,
+                       help='ONNX Runtime intra-op threads (default: 0 = physical cores)')
+    parser.add_argument('--assume-16k', action='store_true',
+                       help='Input is guaranteed to be 16kHz; fail instead of resampling')
+    parser.add_argument('--serve', action='store_true',
+                       help='Load the model once, then transcribe requests read from stdin')
     args = parser.parse_args()
 
-    audio_file = Path(args.audio_file)
-    if not audio_file.exists():
-        print(f"ERROR: Audio file not found: {audio_file}", file=sys.stderr)
-        sys.exit(1)
+    try:
+        check_chunk_duration(args.chunk_duration)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.serve:
+        audio_file = None
+    elif args.audio_file is None:
+        parser.error('audio_file is required unless --serve is given')
+    else:
+        audio_file = Path(args.audio_file)
+        if not audio_file.exists():
+            print(f"ERROR: Audio file not found: {audio_file}", file=sys.stderr)
+            sys.exit(1)
 
     try:
         start_time = time.time()
 
         quantization = None if args.quantization.lower() == 'none' else args.quantization
-        asr = load_model(args.model, quantization=quantization, providers=['CPUExecutionProvider']).with_timestamps()
-        sentences = transcribe_with_chunking(asr, str(audio_file), chunk_duration=args.chunk_duration)
+        sess_options = create_session_options(args.threads)
+        asr = load_asr(args.model, quantization, sess_options, args.provider)
+
+        if args.serve:
+            print(f"Model loaded in {time.time() - start_time:.2f}s", file=sys.stderr, flush=True)
+            serve(asr, args)
+            return
+
+        sentences = transcribe_with_chunking(asr, str(audio_file), chunk_duration=args.chunk_duration,
+                                             assume_16k=args.assume_16k, batch_size=args.batch_size,
+                                             num_workers=args.workers)
 
-        for segment in sentences:
-            print(json.dumps(segment))
+        write_sentences(sentences)
 
         elapsed = time.time() - start_time
         print(f"Processing time: {elapsed:.2f}s", file=sys.stderr)
@@ -212,4 +848,8 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
+    # When frozen, multiprocessing helpers (e.g. the resource tracker on macOS) are
+    # spawned by re-running this executable with '-c <code>'; let PyInstaller's
+    # hook run them and exit before any argument parsing
+    multiprocessing.freeze_support()
     main()
@@ -266,6 +266,7 @@ private:
         args.add (audioFilePath);
         args.add ("--model");
         args.add (modelForPython);
+        args.add ("--assume-16k");
 
         juce::ChildProcess process;
         if (! process.start (args))